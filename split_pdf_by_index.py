@@ -17,8 +17,25 @@ This script will:
 import sys
 import os
 import re
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import PyPDF2
 
+try:
+    # Optional: PyMuPDF (>= 1.19.0) copies pages in C, much faster than PyPDF2
+    # on big books.
+    import pymupdf
+except ImportError:
+    try:
+        # PyMuPDF older than 1.24.3 is only importable as fitz.
+        import fitz as pymupdf
+    except ImportError:
+        pymupdf = None
+# An unrelated PyPI package is also called fitz, and old PyMuPDF releases lack
+# the snake_case API used below; fall back to PyPDF2 for both.
+if pymupdf is not None and not hasattr(getattr(pymupdf, "Document", None), "insert_pdf"):
+    pymupdf = None
+
 TSV_INPUT = """
 
 Please paste your TSV index like the one below:
@@ -42,21 +59,25 @@ Press Enter when you're done, and then press Ctrl+D (on Linux/Mac) or Ctrl+Z (on
 
 # -- Helpers --
 
+_SANITIZE_RE = re.compile(r'[\\/:*?"<>|]')
+
+# Built once at import time; covers both cases so callers need not lower().
+_ROMAN_VALUES = {
+    'm': 1000, 'd': 500, 'c': 100, 'l': 50,
+    'x': 10, 'v': 5, 'i': 1
+}
+_ROMAN_VALUES.update({char.upper(): value for char, value in _ROMAN_VALUES.items()})
+
 def roman_to_int(roman: str) -> int:
     """
     Convert a (modern) roman numeral string to an integer.
     Example: 'xiii' -> 13, 'iv' -> 4.
     This is a simplified approach assuming well-formed Roman numerals.
     """
-    roman = roman.lower()
-    roman_map = {
-        'm': 1000, 'd': 500, 'c': 100, 'l': 50,
-        'x': 10, 'v': 5, 'i': 1
-    }
     result = 0
     prev_value = 0
     for char in reversed(roman):
-        value = roman_map[char]
+        value = _ROMAN_VALUES[char]
         if value >= prev_value:
             result += value
         else:
@@ -69,7 +90,9 @@ def looks_like_roman(s: str) -> bool:
     Check if the string s looks like a roman numeral.
     For simplicity, we test if all chars are in the set {i, v, x, l, c, d, m}
     """
-    return bool(re.match(r'^[IVXLCDMivxlcdm]+$', s.strip()))
+    s = s.strip()
+    # Stripping every numeral character must leave nothing behind.
+    return bool(s) and not s.lstrip('IVXLCDMivxlcdm')
 
 def sanitize_filename(filename: str) -> str:
     """
@@ -77,7 +100,61 @@ def sanitize_filename(filename: str) -> str:
     You can customize as needed.
     """
     # For example, replace slashes, colons, question marks, etc.
-    return re.sub(r'[\\/:*?"<>|]', '_', filename)
+    return _SANITIZE_RE.sub('_', filename)
+
+def write_chapters(pdf_path: str, chapters: list) -> None:
+    """
+    Write each (start_0based, end_0based, output_path) page range of pdf_path
+    (inclusive) to its output file.
+    Runs in a worker process, which parses the source once for its whole batch.
+    Uses PyMuPDF when it is installed and falls back to PyPDF2 otherwise.
+    """
+    if pymupdf is not None:
+        with pymupdf.open(pdf_path) as src:
+            for start_0based, end_0based, output_path in chapters:
+                with pymupdf.open() as dst:
+                    dst.insert_pdf(src, from_page=start_0based, to_page=end_0based)
+                    dst.save(output_path, garbage=4, deflate=True)
+        return
+
+    with open(pdf_path, "rb") as pdf_file:
+        reader = PyPDF2.PdfReader(pdf_file)
+        # reader.pages builds a new lazy list on every access; fetch it once.
+        pages = reader.pages
+
+        for start_0based, end_0based, output_path in chapters:
+            # Extract pages. Fonts/images shared by several pages are written
+            # once per chapter; each chapter is a standalone file, so it needs
+            # its own writer.
+            writer = PyPDF2.PdfWriter()
+            for page_num in range(start_0based, end_0based + 1):
+                writer.add_page(pages[page_num])
+
+            # PyPDF2 emits many small fragments; a 1 MiB buffer batches them
+            # into few large write syscalls without copying the whole file.
+            with open(output_path, "wb", buffering=1 << 20) as outfile:
+                writer.write(outfile)
+
+def write_chapters_in_batches(pdf_path: str, chapters: list):
+    """
+    Write all chapters, in parallel when there is more than one CPU and
+    chapter, yielding each batch of chapters once its files are written.
+    """
+    workers = min(os.cpu_count() or 1, len(chapters))
+    if workers <= 1:
+        # A process pool costs more to start than it saves for a single batch.
+        write_chapters(pdf_path, chapters)
+        yield chapters
+        return
+
+    # Each worker gets an interleaved batch so the source PDF is parsed once
+    # per worker, not once per chapter, and long and short chapters spread evenly.
+    batches = [chapters[k::workers] for k in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(write_chapters, pdf_path, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            future.result()
+            yield futures[future]
 
 # -- Main Logic --
 
@@ -90,10 +167,12 @@ def main():
 
     # 1. Ask the user to input the TSV.
     print(TSV_INPUT)
-    # We'll read from sys.stdin until EOF.
-    tsv_lines = sys.stdin.read().strip().splitlines()
+    # We'll stream sys.stdin line by line until EOF, skipping blank lines,
+    # so the whole index is never held in memory at once.
+    tsv_lines = (line for line in sys.stdin if line.strip())
+    first_line = next(tsv_lines, None)
 
-    if not tsv_lines:
+    if first_line is None:
         print("No TSV data provided. Exiting.")
         sys.exit(1)
 
@@ -104,13 +183,15 @@ def main():
     # Introdução       1
     # ...
     # We'll skip the header if the first line looks like it.
+    # The first numbered entry (smallest page_num > 0) is tracked while parsing.
     entries = []
-    header = tsv_lines[0].split("\t")
+    first_numbered_title, first_numbered_index_page = None, float("inf")
+    header = first_line.rstrip("\n").split("\t")
     if "PDF File Name" in header and "PDF Page" in header:
         # skip the first line
-        data_lines = tsv_lines[1:]
-    else:
         data_lines = tsv_lines
+    else:
+        data_lines = itertools.chain([first_line], tsv_lines)
 
     for line in data_lines:
         parts = line.split("\t")
@@ -122,27 +203,31 @@ def main():
         title = parts[0].strip()
         page_str = parts[1].strip()
 
-        # Decide if 'page_str' is numeric or roman
-        if page_str.isdigit():
+        # Decide if 'page_str' is numeric (the common case) or roman
+        try:
             page_num = int(page_str)
-        elif looks_like_roman(page_str):
+            # int() also accepts signs and digit separators ('-3', '+3', '1_0'),
+            # which are not page numbers.
+            if not page_str[0].isdigit() or "_" in page_str:
+                raise ValueError(page_str)
+        except ValueError:
+            if not looks_like_roman(page_str):
+                print(f"Warning: page '{page_str}' not recognized as numeric or roman. Skipping.")
+                continue
             page_num = roman_to_int(page_str)
-        else:
-            print(f"Warning: page '{page_str}' not recognized as numeric or roman. Skipping.")
-            continue
 
         entries.append((title, page_num))
+        if 0 < page_num < first_numbered_index_page:
+            first_numbered_title, first_numbered_index_page = title, page_num
 
     if not entries:
         print("No valid entries were parsed from TSV. Exiting.")
         sys.exit(1)
 
-    # 3. Find the first numeric entry in the list (smallest page_num > 0).
-    numeric_entries = [(t, p) for (t, p) in entries if p > 0]
-    if not numeric_entries:
+    # 3. Make sure a first numeric entry (smallest page_num > 0) was found.
+    if first_numbered_title is None:
         print("No numeric entries found in the TSV. Exiting.")
         sys.exit(1)
-    first_numbered_title, first_numbered_index_page = min(numeric_entries, key=lambda x: x[1])
 
     # 4. Ask user for the actual PDF page corresponding to that index page.
     print(f"The first numbered chapter in your index appears to be '{first_numbered_title}' (index page {first_numbered_index_page}).")
@@ -163,8 +248,17 @@ def main():
         adjusted_entries.append((title, pdf_page_num))
 
     # 7. Split the PDF according to these pages.
-    reader = PyPDF2.PdfReader(pdf_path)
-    total_pages = len(reader.pages)  # zero-based count of pages
+    # Only the page count is needed here; each worker opens its own reader.
+    # Count pages with the same library that will split the book.
+    if pymupdf is not None:
+        with pymupdf.open(pdf_path) as doc:
+            total_pages = doc.page_count
+    else:
+        # Passing an open file (not a path) lets PyPDF2 read it lazily instead
+        # of loading the whole book into memory first.
+        with open(pdf_path, "rb") as pdf_file:
+            reader = PyPDF2.PdfReader(pdf_file)
+            total_pages = len(reader.pages)  # zero-based count of pages
 
     # Sort the entries by their new PDF page (just in case).
     adjusted_entries.sort(key=lambda x: x[1])
@@ -174,42 +268,36 @@ def main():
     split_dir = os.path.join(pdf_dir, "splits")
     os.makedirs(split_dir, exist_ok=True)
 
-    splitted_files = []
-    for i, (title, start_page) in enumerate(adjusted_entries):
-        if i < len(adjusted_entries) - 1:
-            end_page = adjusted_entries[i+1][1] - 1  # inclusive
-        else:
-            end_page = total_pages  # goes till the end
-
-        # Convert to zero-based for PyPDF2
-        start_0based = start_page - 1
-        end_0based = end_page - 1
+    # Each chapter ends (inclusive) right before the next one starts;
+    # the last one goes till the end.
+    start_pages = [start_page for _, start_page in adjusted_entries]
+    end_pages = [next_start - 1 for next_start in start_pages[1:]] + [total_pages]
 
-        # Ensure within valid range
-        if start_0based < 0:
-            start_0based = 0
-        if end_0based >= total_pages:
-            end_0based = total_pages - 1
+    chapters = []
+    for i, ((title, start_page), end_page) in enumerate(zip(adjusted_entries, end_pages)):
+        # Convert to zero-based and ensure within valid range
+        start_0based = max(start_page - 1, 0)
+        end_0based = min(end_page - 1, total_pages - 1)
 
         if end_0based < start_0based:
             print(f"Warning: invalid page range for '{title}'. Skipping.")
             continue
 
-        # Extract pages
-        writer = PyPDF2.PdfWriter()
-        for page_num in range(start_0based, end_0based + 1):
-            writer.add_page(reader.pages[page_num])
-
         # Build output filename in "splits" directory
         file_index = i + 1
         output_filename = f"{file_index:02d} {sanitize_filename(title)}.pdf"
         output_path = os.path.join(split_dir, output_filename)
 
-        with open(output_path, "wb") as outfile:
-            writer.write(outfile)
+        chapters.append((start_0based, end_0based, output_path))
 
-        splitted_files.append(output_path)
-        print(f"Created: {output_path} (Pages {start_0based+1}–{end_0based+1} in the PDF)")
+    # Report each batch as soon as it is on disk, but list the files in
+    # chapter order at the end.
+    written = set()
+    for batch in write_chapters_in_batches(pdf_path, chapters):
+        for start_0based, end_0based, output_path in batch:
+            written.add(output_path)
+            print(f"Created: {output_path} (Pages {start_0based+1}–{end_0based+1} in the PDF)")
+    splitted_files = [path for _, _, path in chapters if path in written]
 
     print("\nSplitting complete!")
     print("Generated files:")